@@ -0,0 +1,30 @@
+from os import getenv
+import somtodaypython.nonasyncsomtoday as somtodaypython
+from datetime import datetime, timedelta
+
+SCHOOL_NAME = getenv("SCHOOL_NAME")
+STUDENT_NAME = getenv("STUDENT_NAME")
+STUDENT_PASSWORD = getenv("STUDENT_PASSWORD")
+
+school = somtodaypython.find_school(SCHOOL_NAME)
+
+student = school.get_student(STUDENT_NAME, STUDENT_PASSWORD)
+
+begin_datetime = somtodaypython.CET.localize(datetime(2025, 1, 15))
+later = begin_datetime + timedelta(days=1)
+
+aggregator = somtodaypython.ScheduleAggregator()
+aggregator.add_student(student, begin_datetime, later)
+"""
+Call add_student for every student you have,
+a group lesson is only stored once no matter how many students follow it.
+"""
+
+moment = somtodaypython.CET.localize(datetime(2025, 1, 15, 10))
+print("Lokalen in gebruik om 10:00:", ", ".join(
+    aggregator.occupied_locations(moment, moment + timedelta(minutes=1))
+))
+for teacher in aggregator.teachers:
+    print("Rooster van docent(e) {}".format(teacher))
+    for lesuur in aggregator.teacher_schedule(teacher):
+        print("\t{} in {}".format(lesuur.subject_name, lesuur.location))
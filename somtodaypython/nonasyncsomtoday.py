@@ -8,8 +8,9 @@ from io import BytesIO
 import re
 import requests
 import pytz
-from typing import Any, Union, Generator
-from datetime import datetime
+from typing import Any, Iterable, Union, Generator
+from datetime import datetime, timedelta
+from bisect import bisect_left, insort
 from dataclasses import dataclass
 from hashlib import sha256
 from random import choice
@@ -19,6 +20,12 @@ from urllib.parse import urlparse, parse_qs
 CET = pytz.timezone("Europe/Amsterdam")
 
 
+def _localize(moment: datetime) -> datetime:
+    if moment.tzinfo is None:
+        return CET.localize(moment)
+    return moment.astimezone(CET)
+
+
 class PasFoto:
     def __init__(self, pasfoto_bytes: bytes):
         self.pasfoto_bytes = pasfoto_bytes
@@ -87,6 +94,7 @@ class Subject:
     end_hour: int
     location: str
     teacher: str
+    identifier: int
 
     def __init__(self, **kwargs: dict[str, Any]):
         self.subject_name: str = kwargs.get("subject")
@@ -97,6 +105,7 @@ class Subject:
         self.end_hour: int = kwargs.get("endhour")
         self.location: str = kwargs.get("location")
         self.teacher: str = kwargs.get("teacher_shortcut")
+        self.identifier: int = kwargs.get("identifier")
 
     def __hash__(self) -> int:
         return (
@@ -336,12 +345,13 @@ class Student:
             docent_afkorting: str = item.get("additionalObjects").get(
                 "docentAfkortingen"
             )
-            begin_time: datetime = datetime.fromisoformat(
-                item.get("beginDatumTijd")
-            ).replace(tzinfo=CET)
-            end_time: datetime = datetime.fromisoformat(
-                item.get("eindDatumTijd")
-            ).replace(tzinfo=CET)
+            begin_time: datetime = _localize(
+                datetime.fromisoformat(item.get("beginDatumTijd"))
+            )
+            end_time: datetime = _localize(
+                datetime.fromisoformat(item.get("eindDatumTijd"))
+            )
+            links: list[dict] = item.get("links") or [{}]
             target_object = Subject(
                 subject=subject_name,
                 begindt=begin_time,
@@ -350,7 +360,8 @@ class Student:
                 beginhour=begin_lesuur,
                 endhour=eind_lesuur,
                 location=locatie,
-                teacher=docent_afkorting,
+                teacher_shortcut=docent_afkorting,
+                identifier=links[0].get("id"),
             )
             if group_by_day:
                 begin_time_formatted = begin_time.strftime("%Y-%m-%d")
@@ -411,6 +422,362 @@ class Student:
         return School(self.school_name, self.school_uuid)
 
 
+class ScheduleAggregator:
+    """
+    ScheduleAggregator:
+        Merges the timetables of multiple students into per-teacher and per-location timelines.
+        Afspraken are deduplicated by their API identity (Subject.identifier),
+        so a group lesson is only stored once no matter how many enrolled students are added.
+    """
+
+    def __init__(self):
+        self.subjects: dict[tuple, Subject] = {}
+        # timeline entries are (begin_time, end_time, entry number), the entry number keeps them orderable
+        self._teacher_timelines: dict[str, list[tuple[datetime, datetime, int]]] = {}
+        self._location_timelines: dict[str, list[tuple[datetime, datetime, int]]] = {}
+        self._entries: dict[tuple, tuple[datetime, datetime, int]] = {}
+        self._entry_keys: dict[int, tuple] = {}
+        self._entry_counter: int = 0
+        self._longest_subject: timedelta = timedelta(0)
+        # which afspraken every (student, begindt, enddt) fetched by add_student contained
+        self._contributions: dict[tuple, set[tuple]] = {}
+        self._contributors: dict[tuple, set[tuple]] = {}
+
+    def __len__(self) -> int:
+        return len(self.subjects)
+
+    def __contains__(self, subject: Subject) -> bool:
+        return self._subject_key(subject) in self.subjects
+
+    @staticmethod
+    def _subject_fields(subject: Subject) -> tuple:
+        return (
+            subject.subject_name,
+            subject.begin_time,
+            subject.end_time,
+            subject.subject_short,
+            subject.begin_hour,
+            subject.end_hour,
+            subject.location,
+            subject.teacher,
+        )
+
+    @classmethod
+    def _subject_key(cls, subject: Subject) -> tuple:
+        if subject.identifier is not None:
+            return ("id", subject.identifier)
+        # afspraak without links, fall back to its contents
+        return ("content", cls._subject_fields(subject))
+
+    @staticmethod
+    def _teacher_shortcuts(subject: Subject) -> list[str]:
+        if not subject.teacher:
+            return []
+        return list(
+            dict.fromkeys(
+                teacher.strip()
+                for teacher in subject.teacher.split(",")
+                if teacher.strip()
+            )
+        )
+
+    @staticmethod
+    def _normalize(moment: Union[datetime, None]) -> Union[datetime, None]:
+        if moment is None:
+            return None
+        return _localize(moment)
+
+    @staticmethod
+    def _index(
+        timelines: dict[str, list[tuple[datetime, datetime, int]]],
+        key: str,
+        entry: tuple[datetime, datetime, int],
+    ):
+        if key in timelines:
+            insort(timelines[key], entry)
+        else:
+            timelines[key] = [entry]
+
+    @staticmethod
+    def _unindex(
+        timelines: dict[str, list[tuple[datetime, datetime, int]]],
+        key: str,
+        entry: tuple[datetime, datetime, int],
+    ):
+        timeline = timelines[key]
+        del timeline[bisect_left(timeline, entry)]
+        if not timeline:
+            del timelines[key]
+
+    def _insert(self, key: tuple, subject: Subject):
+        self.subjects[key] = subject
+        self._entry_counter += 1
+        entry = (subject.begin_time, subject.end_time, self._entry_counter)
+        self._entries[key] = entry
+        self._entry_keys[self._entry_counter] = key
+        self._longest_subject = max(
+            self._longest_subject, subject.end_time - subject.begin_time
+        )
+        for teacher in self._teacher_shortcuts(subject):
+            self._index(self._teacher_timelines, teacher, entry)
+        if subject.location:
+            self._index(self._location_timelines, subject.location, entry)
+
+    def _drop(self, key: tuple) -> Union[Subject, None]:
+        stored = self.subjects.pop(key, None)
+        if stored is None:
+            return None
+        entry = self._entries.pop(key)
+        del self._entry_keys[entry[2]]
+        for teacher in self._teacher_shortcuts(stored):
+            self._unindex(self._teacher_timelines, teacher, entry)
+        if stored.location:
+            self._unindex(self._location_timelines, stored.location, entry)
+        return stored
+
+    def add_subject(self, subject: Subject) -> bool:
+        """description: adds a single Subject to the timelines.
+        If the afspraak was already added but its data has changed (another room or teacher for example),
+        the stored Subject gets updated in place, so everyone holding it sees the new data.
+
+        Args:
+            subject (Subject): The subject to add
+
+        Returns:
+            bool: False if the same afspraak was already added (by another student), otherwise True.
+        """
+        key = self._subject_key(subject)
+        existing = self.subjects.get(key)
+        if existing is None:
+            self._insert(key, subject)
+            return True
+        if self._subject_fields(existing) == self._subject_fields(subject):
+            return False
+        self._drop(key)
+        existing.__dict__.update(vars(subject))
+        self._insert(key, existing)
+        return True
+
+    def remove_subject(self, subject: Subject) -> bool:
+        """description: removes a Subject from the timelines
+
+        Args:
+            subject (Subject): The subject to remove, matched by its Subject.identifier
+
+        Returns:
+            bool: False if the afspraak wasn't added, otherwise True.
+        """
+        key = self._subject_key(subject)
+        for source in self._contributors.pop(key, ()):
+            self._contributions[source].discard(key)
+        return self._drop(key) is not None
+
+    def clear(self):
+        """description: removes all subjects from the timelines"""
+        self.subjects.clear()
+        self._teacher_timelines.clear()
+        self._location_timelines.clear()
+        self._entries.clear()
+        self._entry_keys.clear()
+        self._contributions.clear()
+        self._contributors.clear()
+        self._longest_subject = timedelta(0)
+
+    def add_schedule(
+        self, schedule: Iterable[Union[Subject, list[Subject]]]
+    ) -> int:
+        """description: adds a schedule returned by Student.fetch_schedule (grouped or not).
+        Afspraken added this way are only removed by ScheduleAggregator.remove_subject or ScheduleAggregator.clear
+
+        Args:
+            schedule (list[Subject] | list[list[Subject]]): The schedule to add
+
+        Returns:
+            int: The amount of afspraken that were new or changed.
+        """
+        added = 0
+        for subject in schedule:
+            if isinstance(subject, list):
+                added += self.add_schedule(subject)
+            elif self.add_subject(subject):
+                added += 1
+        return added
+
+    def _schedule_keys(
+        self, schedule: list[Union[Subject, list[Subject]]]
+    ) -> set[tuple]:
+        keys = set()
+        for subject in schedule:
+            if isinstance(subject, list):
+                keys |= self._schedule_keys(subject)
+            else:
+                keys.add(self._subject_key(subject))
+        return keys
+
+    def _canonical(
+        self, schedule: list[Union[Subject, list[Subject]]]
+    ) -> list[Union[Subject, list[Subject]]]:
+        return [
+            (
+                self._canonical(subject)
+                if isinstance(subject, list)
+                else self.subjects[self._subject_key(subject)]
+            )
+            for subject in schedule
+        ]
+
+    def add_student(
+        self,
+        student: Student,
+        begindt: datetime,
+        enddt: datetime,
+        group_by_day: bool = False,
+    ) -> int:
+        """description: fetches the timetable of a student and adds it.
+        Student.school_subjects gets replaced with the Subjects stored in the aggregator,
+        so the student doesn't keep its own copy of every group lesson.
+        Calling this again for the same student, begindt and enddt refreshes it:
+        afspraken that are gone (cancelled for example) get removed, unless another student still has them.
+
+        Args:
+            student (Student): The student to fetch the timetable from
+            begindt (datetime): starting date to fetch
+            enddt (datetime): ending date to fetch
+            group_by_day (bool, optional): to group Student.school_subjects by day. Defaults to False.
+
+        Returns:
+            int: The amount of afspraken that were new or changed.
+        """
+        schedule = student.fetch_schedule(begindt, enddt, group_by_day)
+        added = self.add_schedule(schedule)
+        source = (student.identifier, begindt, enddt)
+        keys = self._schedule_keys(schedule)
+        for key in self._contributions.get(source, set()) - keys:
+            contributors = self._contributors[key]
+            contributors.discard(source)
+            if not contributors:
+                del self._contributors[key]
+                self._drop(key)
+        for key in keys:
+            self._contributors.setdefault(key, set()).add(source)
+        self._contributions[source] = keys
+        student.school_subjects = self._canonical(schedule)
+        return added
+
+    def _query(
+        self,
+        timeline: list[tuple[datetime, datetime, int]],
+        begindt: Union[datetime, None],
+        enddt: Union[datetime, None],
+    ) -> list[Subject]:
+        begindt = self._normalize(begindt)
+        enddt = self._normalize(enddt)
+        if begindt is None:
+            start = 0
+        else:
+            # nothing that starts before this can still be running at begindt
+            start = bisect_left(timeline, (begindt - self._longest_subject,))
+        stop = len(timeline) if enddt is None else bisect_left(timeline, (enddt,))
+        return [
+            self.subjects[self._entry_keys[number]]
+            for _, end_time, number in timeline[start:stop]
+            if begindt is None or end_time > begindt
+        ]
+
+    @property
+    def teachers(self) -> list[str]:
+        """description: All teacher shortcuts that occur in the added schedules (list[str])"""
+        return sorted(self._teacher_timelines)
+
+    @property
+    def locations(self) -> list[str]:
+        """description: All locations that occur in the added schedules (list[str])"""
+        return sorted(self._location_timelines)
+
+    def teacher_schedule(
+        self,
+        teacher: str,
+        begindt: Union[datetime, None] = None,
+        enddt: Union[datetime, None] = None,
+    ) -> list[Subject]:
+        """description: The timetable of a teacher, sorted by begin time
+
+        Args:
+            teacher (str): The teacher's shortcut (Subject.teacher)
+            begindt (datetime, optional): Only subjects that are still running after this moment, naive datetimes are treated as Europe/Amsterdam time. Defaults to None.
+            enddt (datetime, optional): Only subjects that start before this moment, naive datetimes are treated as Europe/Amsterdam time. Defaults to None.
+
+        Returns:
+            list[Subject]: The subjects of the teacher
+        """
+        return self._query(self._teacher_timelines.get(teacher, []), begindt, enddt)
+
+    def location_schedule(
+        self,
+        location: str,
+        begindt: Union[datetime, None] = None,
+        enddt: Union[datetime, None] = None,
+    ) -> list[Subject]:
+        """description: The timetable of a location, sorted by begin time
+
+        Args:
+            location (str): The location (Subject.location)
+            begindt (datetime, optional): Only subjects that are still running after this moment, naive datetimes are treated as Europe/Amsterdam time. Defaults to None.
+            enddt (datetime, optional): Only subjects that start before this moment, naive datetimes are treated as Europe/Amsterdam time. Defaults to None.
+
+        Returns:
+            list[Subject]: The subjects in the location
+        """
+        return self._query(self._location_timelines.get(location, []), begindt, enddt)
+
+    def is_location_occupied(
+        self, location: str, begindt: datetime, enddt: datetime
+    ) -> bool:
+        """description: Checks if a location is in use somewhere between begindt and enddt
+
+        Args:
+            location (str): The location (Subject.location)
+            begindt (datetime): starting moment, naive datetimes are treated as Europe/Amsterdam time
+            enddt (datetime): ending moment, naive datetimes are treated as Europe/Amsterdam time
+
+        Returns:
+            bool: True if a subject takes place in the location
+        """
+        return bool(self.location_schedule(location, begindt, enddt))
+
+    def occupied_locations(self, begindt: datetime, enddt: datetime) -> list[str]:
+        """description: All locations that are in use somewhere between begindt and enddt
+
+        Args:
+            begindt (datetime): starting moment, naive datetimes are treated as Europe/Amsterdam time
+            enddt (datetime): ending moment, naive datetimes are treated as Europe/Amsterdam time
+
+        Returns:
+            list[str]: The occupied locations
+        """
+        return [
+            location
+            for location in self.locations
+            if self.is_location_occupied(location, begindt, enddt)
+        ]
+
+    def busy_teachers(self, begindt: datetime, enddt: datetime) -> list[str]:
+        """description: All teachers that are teaching somewhere between begindt and enddt
+
+        Args:
+            begindt (datetime): starting moment, naive datetimes are treated as Europe/Amsterdam time
+            enddt (datetime): ending moment, naive datetimes are treated as Europe/Amsterdam time
+
+        Returns:
+            list[str]: The teacher shortcuts
+        """
+        return [
+            teacher
+            for teacher in self.teachers
+            if self.teacher_schedule(teacher, begindt, enddt)
+        ]
+
+
 class School:
     """
     Model that represents a school.
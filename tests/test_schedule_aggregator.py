@@ -0,0 +1,147 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from somtodaypython.nonasyncsomtoday import CET, ScheduleAggregator, Subject
+
+
+def at(hour: int, minute: int = 0) -> datetime:
+    return CET.localize(datetime(2025, 1, 15, hour, minute))
+
+
+def make_subject(
+    identifier=None, begin=8, end=9, location="A1", teacher="abc", name="Wiskunde"
+) -> Subject:
+    return Subject(
+        subject=name,
+        begindt=at(begin),
+        enddt=at(end),
+        subject_short=name[:3].lower(),
+        beginhour=begin - 7,
+        endhour=end - 8,
+        location=location,
+        teacher_shortcut=teacher,
+        identifier=identifier,
+    )
+
+
+class FakeStudent:
+    def __init__(self, identifier: int, schedule: list):
+        self.identifier = identifier
+        self.schedule = schedule
+        self.school_subjects = []
+
+    def fetch_schedule(self, begindt, enddt, group_by_day=False):
+        if group_by_day:
+            return [list(self.schedule)]
+        return list(self.schedule)
+
+
+@pytest.fixture
+def aggregator() -> ScheduleAggregator:
+    return ScheduleAggregator()
+
+
+def test_deduplicates_across_schedules(aggregator):
+    assert aggregator.add_schedule([make_subject(1), make_subject(2, 10, 11)]) == 2
+    assert aggregator.add_schedule([make_subject(1), make_subject(3, 12, 13)]) == 1
+    assert len(aggregator) == 3
+    assert len(aggregator.location_schedule("A1")) == 3
+
+
+def test_grouped_and_flat_input(aggregator):
+    flat = ScheduleAggregator()
+    subjects = [make_subject(1), make_subject(2, 10, 11, location="B2")]
+    assert flat.add_schedule(subjects) == 2
+    assert aggregator.add_schedule([[subjects[0]], [subjects[1]]]) == 2
+    assert aggregator.locations == flat.locations == ["A1", "B2"]
+
+
+def test_interval_edges(aggregator):
+    aggregator.add_subject(make_subject(1, 8, 9))
+    assert not aggregator.is_location_occupied("A1", at(9), at(10))
+    assert not aggregator.is_location_occupied("A1", at(7), at(8))
+    assert aggregator.is_location_occupied("A1", at(8, 59), at(9))
+    assert aggregator.occupied_locations(at(8), at(8)) == []
+
+
+def test_long_subject_found_through_window(aggregator):
+    aggregator.add_subject(make_subject(1, 8, 16, location="Aula"))
+    aggregator.add_subject(make_subject(2, 13, 14, location="Aula"))
+    found = aggregator.location_schedule("Aula", at(15), at(15, 30))
+    assert [s.identifier for s in found] == [1]
+
+
+def test_timezone_handling(aggregator):
+    aggregator.add_subject(make_subject(1, 8, 9))
+    # 08:10 UTC is 09:10 in Amsterdam, after the lesson
+    moment = datetime(2025, 1, 15, 8, 10, tzinfo=timezone.utc)
+    assert aggregator.occupied_locations(moment, moment + timedelta(minutes=1)) == []
+    naive = datetime(2025, 1, 15, 8, 30)
+    assert aggregator.occupied_locations(naive, naive + timedelta(minutes=1)) == ["A1"]
+
+
+def test_replacement_moves_subject(aggregator):
+    original = make_subject(2, 10, 11, location="A1", teacher="abc")
+    aggregator.add_subject(original)
+    assert aggregator.add_subject(make_subject(2, 10, 11, location="C3", teacher="def"))
+    assert aggregator.location_schedule("A1") == []
+    assert aggregator.teacher_schedule("abc") == []
+    assert aggregator.location_schedule("C3") == [original]
+    assert aggregator.teacher_schedule("def") == [original]
+    assert original.location == "C3"
+    assert not aggregator.add_subject(make_subject(2, 10, 11, location="C3", teacher="def"))
+
+
+def test_duplicate_teacher_shortcuts(aggregator):
+    aggregator.add_subject(make_subject(1, teacher="abc, abc"))
+    assert len(aggregator.teacher_schedule("abc")) == 1
+    aggregator.remove_subject(make_subject(1))
+    assert aggregator.teachers == []
+
+
+def test_key_namespaces(aggregator):
+    linked = make_subject(1)
+    swapped_a = make_subject(None, location="abc", teacher="B1")
+    swapped_b = make_subject(None, location="B1", teacher="abc")
+    no_location = make_subject(None, location=None, teacher="abc")
+    assert aggregator.add_schedule([linked, swapped_a, swapped_b, no_location]) == 4
+    assert aggregator.add_subject(make_subject(None, location="abc", teacher="B1")) is False
+
+
+def test_remove_and_clear(aggregator):
+    aggregator.add_schedule([make_subject(1), make_subject(2, 10, 11, location="B2")])
+    assert aggregator.remove_subject(make_subject(1))
+    assert not aggregator.remove_subject(make_subject(1))
+    assert aggregator.locations == ["B2"]
+    assert make_subject(2) in aggregator
+    aggregator.clear()
+    assert len(aggregator) == 0
+    assert aggregator.locations == aggregator.teachers == []
+
+
+def test_add_student_shares_subjects(aggregator):
+    first = FakeStudent(1, [make_subject(1)])
+    second = FakeStudent(2, [make_subject(1)])
+    aggregator.add_student(first, at(0), at(23))
+    aggregator.add_student(second, at(0), at(23), group_by_day=True)
+    assert second.school_subjects[0][0] is first.school_subjects[0]
+
+    second.schedule = [make_subject(1, location="C3")]
+    aggregator.add_student(second, at(0), at(23))
+    assert first.school_subjects[0].location == "C3"
+
+
+def test_add_student_drops_cancelled(aggregator):
+    first = FakeStudent(1, [make_subject(1), make_subject(2, 10, 11)])
+    second = FakeStudent(2, [make_subject(1)])
+    aggregator.add_student(first, at(0), at(23))
+    aggregator.add_student(second, at(0), at(23))
+
+    first.schedule = []
+    aggregator.add_student(first, at(0), at(23))
+    assert [s.identifier for s in aggregator.location_schedule("A1")] == [1]
+
+    second.schedule = []
+    aggregator.add_student(second, at(0), at(23))
+    assert aggregator.location_schedule("A1") == []